@@ -0,0 +1,62 @@
+# _llm.py
+import asyncio
+import weakref
+from functools import lru_cache
+import httpx
+from langchain_openai import ChatOpenAI
+from dotenv import load_dotenv
+from github_client import HTTP2_AVAILABLE
+
+load_dotenv() # Load environment variables for LLM keys
+
+# Sized for the batch endpoint's fan-out (REPORT_CHAIN.abatch) and the streaming endpoint's concurrent requests.
+# HTTP/2 needs the optional `h2` package (httpx[http2]); without it, fall back to pooled HTTP/1.1
+_LLM_HTTP_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+
+class _PerLoopAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Gives each event loop its own async connection pool. Pooled connections are bound to the
+    loop that opened them, and the cached ChatOpenAI outlives loops (the CLI workflow runs a
+    fresh one per asyncio.run()), so a single pool would be reused across loops.
+    """
+    def __init__(self):
+        self._transports = weakref.WeakKeyDictionary() # Pools of loops that are gone are dropped with them
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, limits=_LLM_HTTP_LIMITS)
+            self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+_HTTP_CLIENT = httpx.Client(http2=HTTP2_AVAILABLE, limits=_LLM_HTTP_LIMITS) # Sync calls (CLI analyze_result_node)
+_ASYNC_TRANSPORT = _PerLoopAsyncTransport()
+_HTTP_ASYNC_CLIENT = httpx.AsyncClient(transport=_ASYNC_TRANSPORT) # ainvoke/abatch/astream_events
+
+async def aclose_llm_client() -> None:
+    """
+    Closes the running event loop's LLM connection pool. Call before the loop ends.
+    """
+    await _ASYNC_TRANSPORT.aclose()
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = "gpt-4o-mini") -> ChatOpenAI:
+    """
+    Returns the shared ChatOpenAI instance for the given model. All callers reuse
+    the same instance and the same HTTP/2 connection pools (one per event loop for async calls).
+    """
+    return ChatOpenAI(
+        model=model,
+        temperature=0,
+        http_client=_HTTP_CLIENT,
+        http_async_client=_HTTP_ASYNC_CLIENT
+    )
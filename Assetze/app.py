@@ -1,67 +1,68 @@
 # langgraph_app.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import ChatOpenAI
+from _llm import get_llm, aclose_llm_client
 from langgraph.graph import StateGraph, END
-from verify import verify_github_token_tool # Import your tool
+from pydantic import BaseModel, Field
+from tools.github_verifier import verify_github_token_api, aclose_client
+from graph_nodes import verify_tokens_batch
+from workflow_state import GithubTokenVerificationState
 import uvicorn
 import json
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await aclose_client() # Release the pooled GitHub and OpenAI connections on shutdown
+    await aclose_llm_client()
 
-# Define the state of the graph
-class WorkflowState:
-    token: str
-    verification_result: dict
-    analysis_message: str
-    remediation_suggestions: str
+app = FastAPI(lifespan=lifespan)
 
 # Define the LLM
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-
-# Define the nodes
-def call_token_verifier(state: WorkflowState):
-    result_json = verify_github_token_tool.run(state.token)
-    state.verification_result = json.loads(result_json)
-    return state
-
-def analyze_verification_result(state: WorkflowState):
-    is_valid = state.verification_result.get("valid")
-    message = state.verification_result.get("message")
-    scopes = state.verification_result.get("scopes")
-    status_code = state.verification_result.get("status_code")
-
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", "You are an AI assistant analyzing GitHub token verification results. Summarize the outcome and state if the token is valid or invalid. If valid, list the scopes. If invalid, provide a concise reason."),
-        ("human", f"Verification Result:\nValid: {is_valid}\nMessage: {message}\nScopes: {scopes}\nStatus Code: {status_code}")
-    ])
-    chain = prompt_template | llm
-    analysis = chain.invoke({"input": ""}).content
-    state.analysis_message = analysis
-    return state
-
-def generate_remediation_suggestions(state: WorkflowState):
-    is_valid = state.verification_result.get("valid")
-    message = state.verification_result.get("message")
-    status_code = state.verification_result.get("status_code")
-
-    if is_valid:
-        state.remediation_suggestions = "Token is valid. No remediation needed."
-        return state
-
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", "You are an AI assistant providing remediation advice for GitHub token issues. Based on the error message, suggest concrete steps to resolve the issue."),
-        ("human", f"Error Message: {message}\nStatus Code: {status_code}\nWhat steps should I take to fix this GitHub token issue?")
-    ])
-    chain = prompt_template | llm
-    suggestions = chain.invoke({"input": ""}).content
-    state.remediation_suggestions = suggestions
-    return state
+llm = get_llm() # Same instance (and connection pool) as graph_nodes
+
+# Prompts and chains are structurally constant, so build them once at import and fill variables per call
+ANALYZE_CHAIN = ChatPromptTemplate.from_messages([
+    ("system", "You are an AI assistant analyzing GitHub token verification results. Summarize the outcome and state if the token is valid or invalid. If valid, list the scopes. If invalid, provide a concise reason."),
+    ("human", "Verification Result:\nValid: {is_valid}\nMessage: {message}\nScopes: {scopes}\nStatus Code: {status_code}")
+]) | llm
+
+REMEDIATE_CHAIN = ChatPromptTemplate.from_messages([
+    ("system", "You are an AI assistant providing remediation advice for GitHub token issues. Based on the error message, suggest concrete steps to resolve the issue."),
+    ("human", "Error Message: {message}\nStatus Code: {status_code}\nWhat steps should I take to fix this GitHub token issue?")
+]) | llm
+
+# Define the nodes. Each returns only the keys it updates; LangGraph merges them into the state.
+async def call_token_verifier(state: GithubTokenVerificationState):
+    return {"verification_result": await verify_github_token_api.ainvoke(state["token"])}
+
+async def analyze_verification_result(state: GithubTokenVerificationState):
+    verification_result = state["verification_result"]
+    analysis = (await ANALYZE_CHAIN.ainvoke({
+        "is_valid": verification_result.get("valid"),
+        "message": verification_result.get("message"),
+        "scopes": verification_result.get("scopes"),
+        "status_code": verification_result.get("status_code")
+    })).content
+    return {"analysis_message": analysis}
+
+async def generate_remediation_suggestions(state: GithubTokenVerificationState):
+    verification_result = state["verification_result"]
+    if verification_result.get("valid"):
+        return {"remediation_suggestions": "Token is valid. No remediation needed."}
+
+    suggestions = (await REMEDIATE_CHAIN.ainvoke({
+        "message": verification_result.get("message"),
+        "status_code": verification_result.get("status_code")
+    })).content
+    return {"remediation_suggestions": suggestions}
 
 # Define the graph
-workflow = StateGraph(WorkflowState)
+workflow = StateGraph(GithubTokenVerificationState)
 
 workflow.add_node("verify", call_token_verifier)
 workflow.add_node("analyze", analyze_verification_result)
@@ -71,8 +72,8 @@ workflow.set_entry_point("verify")
 
 workflow.add_edge("verify", "analyze")
 
-def should_remediate(state: WorkflowState):
-    return "remediate" if not state.verification_result.get("valid") else "end"
+def should_remediate(state: GithubTokenVerificationState):
+    return "remediate" if not state["verification_result"].get("valid") else "end"
 
 workflow.add_conditional_edges(
     "analyze",
@@ -86,28 +87,80 @@ workflow.add_edge("remediate", END)
 
 app_graph = workflow.compile()
 
+# LLM tokens from these graph nodes are forwarded to the client under the given event name
+STREAMED_NODES = {"analyze": "analysis", "remediate": "remediation_suggestions"}
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_workflow(initial_state: GithubTokenVerificationState):
+    try:
+        async for event in app_graph.astream_events(initial_state, version="v2"):
+            kind = event["event"]
+            node = event["metadata"].get("langgraph_node")
+            if kind == "on_chat_model_stream" and node in STREAMED_NODES:
+                content = event["data"]["chunk"].content
+                if content:
+                    yield _sse(STREAMED_NODES[node], content)
+            elif kind == "on_chain_end" and event["name"] == "verify":
+                verification_result = event["data"]["output"]["verification_result"]
+                yield _sse("verification", {
+                    "token_valid": verification_result.get("valid"),
+                    "scopes": verification_result.get("scopes"),
+                    "status_code_from_github": verification_result.get("status_code")
+                })
+    except Exception as e:
+        # The response has already started, so report failures (e.g. OpenAI errors) in-stream
+        yield _sse("error", str(e))
+    yield _sse("done", None)
+
 @app.post("/verify_token_langgraph/")
 async def verify_token_langgraph_endpoint(token_data: dict):
     token = token_data.get("token")
     if not token:
-        return {"error": "Token not provided"}, 400
+        raise HTTPException(status_code=400, detail="Token not provided")
 
     # Initialize state with the token
-    initial_state = WorkflowState(
+    initial_state = GithubTokenVerificationState(
         token=token,
         verification_result={},
+        rate_limit=None,
         analysis_message="",
         remediation_suggestions=""
     )
 
-    final_state = app_graph.invoke(initial_state) # Invoke the graph
+    # Stream the graph run as server-sent events so clients see LLM output as it is generated
+    return StreamingResponse(_stream_workflow(initial_state), media_type="text/event-stream")
+
+MAX_BATCH_TOKENS = 100 # Bounds the GitHub fan-out and the size of the LLM batch per request
+
+class BatchVerifyRequest(BaseModel):
+    tokens: list[str] = Field(min_length=1, max_length=MAX_BATCH_TOKENS)
+
+@app.post("/batch_verify_tokens/")
+async def batch_verify_tokens_endpoint(request: BatchVerifyRequest):
+    """
+    Verifies up to MAX_BATCH_TOKENS tokens. Unlike /verify_token_langgraph/, this runs the
+    graph_nodes pipeline (the main_workflow CLI logic): malformed tokens are rejected without a
+    GitHub call, well-known outcomes get the static report, and the rest share one structured
+    LLM batch. Analysis text can therefore differ from the streaming endpoint for the same token.
+    """
+    # Every entry is verified, empty ones included (they get a "No token provided" result),
+    # so results[i] always belongs to request.tokens[i].
+    # GitHub checks run concurrently and the LLM analysis goes out as a single batch.
+    final_states = await verify_tokens_batch(request.tokens)
 
     return {
-        "token_valid": final_state.verification_result.get("valid"),
-        "scopes": final_state.verification_result.get("scopes"),
-        "analysis": final_state.analysis_message,
-        "remediation_suggestions": final_state.remediation_suggestions,
-        "status_code_from_github": final_state.verification_result.get("status_code")
+        "results": [
+            {
+                "token_valid": state["verification_result"].get("valid"),
+                "scopes": state["verification_result"].get("scopes"),
+                "analysis": state["analysis_message"],
+                "remediation_suggestions": state["remediation_suggestions"],
+                "status_code_from_github": state["verification_result"].get("status_code")
+            }
+            for state in final_states
+        ]
     }
 
 if __name__ == "__main__":
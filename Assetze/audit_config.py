@@ -0,0 +1,42 @@
+# audit_config.py
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+@dataclass(frozen=True)
+class AuditConfig:
+    """
+    Settings for the GitHub audit scripts, read from the environment (and .env) once per process.
+    Frozen and built only from plain values, so it can be shared freely or pickled to worker processes.
+    """
+    token: str | None
+    org: str | None
+    repos: tuple[tuple[str, str], ...] # (owner, repo) pairs parsed from GITHUB_REPOSITORIES
+    prefix: str
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def from_env(cls, default_prefix: str = "github_audit_report") -> "AuditConfig":
+        """
+        Builds the config from GITHUB_TOKEN, GITHUB_ORGANIZATION, GITHUB_REPOSITORIES ("owner/repo,...")
+        and OUTPUT_CSV_PREFIX. Cached, so repeated calls (e.g. from a scheduler) return the same instance.
+        """
+        load_dotenv()
+        repos = []
+        for repo_full_name in (os.getenv("GITHUB_REPOSITORIES") or "").split(','):
+            repo_full_name = repo_full_name.strip()
+            if not repo_full_name:
+                continue
+            if '/' in repo_full_name:
+                owner, repo_name = repo_full_name.split('/', 1)
+                repos.append((owner, repo_name))
+            else:
+                print(f"Warning: Skipping malformed repository entry: '{repo_full_name}'. Expected format 'owner/repo'.")
+
+        return cls(
+            token=os.getenv("GITHUB_TOKEN"),
+            org=os.getenv("GITHUB_ORGANIZATION"),
+            repos=tuple(repos),
+            prefix=os.getenv("OUTPUT_CSV_PREFIX", default_prefix)
+        )
@@ -1,12 +1,123 @@
 import requests
 import os
 import csv
+import urllib3
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from github_client import decode_json, dumps_json, loads_json
 
 # Ensure .env is loaded (if running independently)
 load_dotenv()
 
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+_HEADERS_TMPL = {
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28"
+}
+BRANCHES_PER_PAGE = 100
+CSV_FLUSH_EVERY_PAGES = 10 # Batch disk writes instead of flushing per page
+
+# GraphQL queries are read-only, so POSTs are as safe to retry as GETs; urllib3 skips POST unless
+# allowed_methods says otherwise
+_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=None, respect_retry_after_header=True)
+
+# Shared session so every GraphQL page reuses a pooled keep-alive connection to api.github.com
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=_RETRY))
+
+# Lower-overhead pool for the branch pagination loop: no session merging, hooks or cookie handling per page.
+# Every request passes its full headers (which replace, not merge with, pool headers), so none are set here.
+_POOL = urllib3.PoolManager(num_pools=2, maxsize=10, retries=_RETRY)
+
+# Selects only the fields written to the CSVs. Repository details, the default branch HEAD commit and
+# the latest release are only requested on the first page; later pages just walk the branch refs.
+REPOSITORY_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $cursor: String, $withDetails: Boolean!) {
+  repository(owner: $owner, name: $name) {
+    ... @include(if: $withDetails) {
+      isPrivate
+      description
+      createdAt
+      updatedAt
+      pushedAt
+      licenseInfo { spdxId }
+      defaultBranchRef {
+        name
+        target { ... on Commit { oid messageHeadline authoredDate } }
+      }
+      latestRelease {
+        name
+        tagName
+        publishedAt
+        isPrerelease
+        url
+        author { login }
+      }
+    }
+    refs(refPrefix: "refs/heads/", first: $first, after: $cursor) {
+      pageInfo { endCursor hasNextPage }
+      nodes {
+        name
+        branchProtectionRule { id }
+        rules(first: 1) { totalCount }
+        target { oid }
+      }
+    }
+  }
+}
+"""
+
+def _query_repository(headers: dict, owner: str, repo: str, cursor: str | None = None, with_details: bool = False) -> dict:
+    """
+    Runs REPOSITORY_QUERY and returns the `repository` object.
+    Raises requests.exceptions.HTTPError on HTTP failures and ValueError on GraphQL errors.
+    """
+    variables = {"owner": owner, "name": repo, "first": BRANCHES_PER_PAGE, "cursor": cursor, "withDetails": with_details}
+    response = _SESSION.post(GITHUB_GRAPHQL_URL, headers=headers, json={"query": REPOSITORY_QUERY, "variables": variables}, timeout=10)
+    response.raise_for_status()
+    payload = decode_json(response)
+    if payload.get("errors"):
+        raise ValueError("; ".join(error.get("message", "Unknown GraphQL error") for error in payload["errors"]))
+    return payload["data"]["repository"]
+
+def _query_branch_page(json_headers: dict, owner: str, repo: str, cursor: str) -> dict:
+    """
+    Fetches one follow-up page of branch refs over the raw urllib3 pool and returns the `refs` object.
+    json_headers must already carry Content-Type: application/json (built once per audit, not per page).
+    Raises ValueError on HTTP or GraphQL errors.
+    """
+    variables = {"owner": owner, "name": repo, "first": BRANCHES_PER_PAGE, "cursor": cursor, "withDetails": False}
+    response = _POOL.request(
+        "POST",
+        GITHUB_GRAPHQL_URL,
+        body=dumps_json({"query": REPOSITORY_QUERY, "variables": variables}),
+        headers=json_headers,
+        timeout=10.0
+    )
+    if response.status != 200:
+        raise ValueError(f"HTTP {response.status}: {response.data[:200].decode(errors='replace')}")
+    payload = loads_json(response.data)
+    if payload.get("errors"):
+        raise ValueError("; ".join(error.get("message", "Unknown GraphQL error") for error in payload["errors"]))
+    return payload["data"]["repository"]["refs"]
+
+def _branch_rows(ref_nodes: list[dict], base_url: str, repo_full_name: str):
+    """
+    Maps one page of branch refs to CSV rows.
+    """
+    for ref in ref_nodes:
+        sha = (ref.get("target") or {}).get("oid")
+        yield {
+            "Repository": repo_full_name,
+            "Branch Name": ref.get("name"),
+            "Latest Commit SHA": sha,
+            # Matches REST `protected`: a classic branch protection rule or any repository ruleset rule
+            "Protected": ref.get("branchProtectionRule") is not None or bool((ref.get("rules") or {}).get("totalCount")),
+            "URL": f"{base_url}/commits/{sha}" # This URL links to commit details, useful for date
+        }
+
 def get_repository_info_to_csv(token: str, owner: str, repo: str, output_dir: str = "audit_data"):
     """
     Fetches latest branching and version information for a GitHub repository and saves it to CSVs.
@@ -18,136 +129,113 @@ def get_repository_info_to_csv(token: str, owner: str, repo: str, output_dir: st
         output_dir (str): Directory to save the CSV files.
     """
     base_url = f"https://api.github.com/repos/{owner}/{repo}"
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.com+json",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
+    headers = {**_HEADERS_TMPL, "Authorization": f"token {token}"}
+    json_headers = {**headers, "Content-Type": "application/json"} # For the raw urllib3 branch-page POSTs
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
 
-    # --- 1. Get Repository Details (for default branch) ---
-    repo_details_url = base_url
+    # --- 1. Get Repository Details, Default Branch HEAD, Latest Release and First Page of Branches ---
     print(f"\nFetching repository details for {owner}/{repo}...")
     try:
-        response = requests.get(repo_details_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        repo_data = response.json()
-
-        default_branch = repo_data.get("default_branch")
-        print(f"  - Default branch: {default_branch}")
-
-        # --- 2. Get Latest Commit on Default Branch ---
-        commit_url = f"{base_url}/commits/{default_branch}"
-        print(f"  - Fetching latest commit for default branch ({default_branch})...")
-        commit_response = requests.get(commit_url, headers=headers, timeout=10)
-        commit_response.raise_for_status()
-        latest_commit_data = commit_response.json()
-
-        latest_commit_sha = latest_commit_data.get("sha")
-        latest_commit_message = latest_commit_data.get("commit", {}).get("message", "").split('\n')[0]
-        latest_commit_date = latest_commit_data.get("commit", {}).get("author", {}).get("date")
-
-        repo_info = {
-            "Repository": f"{owner}/{repo}",
-            "Default Branch": default_branch,
-            "Latest Commit SHA": latest_commit_sha,
-            "Latest Commit Message": latest_commit_message,
-            "Latest Commit Date": latest_commit_date,
-            "Public": not repo_data.get("private"),
-            "Description": repo_data.get("description"),
-            "Created At": repo_data.get("created_at"),
-            "Last Updated At": repo_data.get("updated_at"),
-            "Pushed At": repo_data.get("pushed_at"),
-            "License": repo_data.get("license", {}).get("spdx_id") if repo_data.get("license") else "N/A"
-        }
-
-        output_file_repo_info = os.path.join(output_dir, f"{owner}_{repo}_repo_info.csv")
-        with open(output_file_repo_info, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = list(repo_info.keys())
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerow(repo_info)
-        print(f"  - Saved repository info to {output_file_repo_info}")
-
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 404:
+        repo_data = _query_repository(headers, owner, repo, with_details=True)
+        if repo_data is None:
             print(f"Error: Repository '{owner}/{repo}' not found.")
+            return
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 401:
+            print("Error: Unauthorized. Check that your GitHub token is valid.")
         elif e.response.status_code == 403:
             print(f"Error: Forbidden. Insufficient permissions for {owner}/{repo}. Ensure your token has 'repo' scope.")
         else:
             print(f"HTTP Error fetching repo info (HTTP {e.response.status_code}): {e.response.text}")
         return # Exit if repo info fails
+    except ValueError as e:
+        print(f"Error fetching repo info for {owner}/{repo}: {e}")
+        return
     except requests.exceptions.RequestException as e:
         print(f"Network error fetching repo info: {e}")
         return
 
-    # --- 3. Get Latest Release (if any) ---
-    releases_url = f"{base_url}/releases/latest"
-    print(f"  - Fetching latest release for {owner}/{repo}...")
-    try:
-        response = requests.get(releases_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            latest_release = response.json()
-            release_info = {
-                "Repository": f"{owner}/{repo}",
-                "Release Name": latest_release.get("name"),
-                "Tag Name": latest_release.get("tag_name"),
-                "Published At": latest_release.get("published_at"),
-                "Author": latest_release.get("author", {}).get("login"),
-                "Is Pre-release": latest_release.get("prerelease"),
-                "Release URL": latest_release.get("html_url")
-            }
-            output_file_release = os.path.join(output_dir, f"{owner}_{repo}_latest_release.csv")
-            with open(output_file_release, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = list(release_info.keys())
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerow(release_info)
-            print(f"  - Saved latest release info to {output_file_release}")
-        elif response.status_code == 404:
-            print(f"  - No latest release found for {owner}/{repo}.")
-        else:
-            print(f"  - Error fetching latest release (HTTP {response.status_code}): {response.text}")
-    except requests.exceptions.RequestException as e:
-        print(f"  - Network error fetching latest release: {e}")
+    default_branch_ref = repo_data.get("defaultBranchRef") or {}
+    default_branch = default_branch_ref.get("name")
+    latest_commit_data = default_branch_ref.get("target") or {}
+    print(f"  - Default branch: {default_branch}")
+
+    repo_info = {
+        "Repository": f"{owner}/{repo}",
+        "Default Branch": default_branch,
+        "Latest Commit SHA": latest_commit_data.get("oid"),
+        "Latest Commit Message": latest_commit_data.get("messageHeadline"),
+        "Latest Commit Date": latest_commit_data.get("authoredDate"),
+        "Public": not repo_data.get("isPrivate"),
+        "Description": repo_data.get("description"),
+        "Created At": repo_data.get("createdAt"),
+        "Last Updated At": repo_data.get("updatedAt"),
+        "Pushed At": repo_data.get("pushedAt"),
+        "License": repo_data.get("licenseInfo", {}).get("spdxId") if repo_data.get("licenseInfo") else "N/A"
+    }
 
-    # --- 4. Get All Branches ---
-    branches_url = f"{base_url}/branches"
-    all_branches_data = []
-    page = 1
+    output_file_repo_info = os.path.join(output_dir, f"{owner}_{repo}_repo_info.csv")
+    with open(output_file_repo_info, 'w', newline='', encoding='utf-8') as csvfile:
+        fieldnames = list(repo_info.keys())
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerow(repo_info)
+    print(f"  - Saved repository info to {output_file_repo_info}")
+
+    # --- 2. Latest Release (if any), already included in the first query ---
+    latest_release = repo_data.get("latestRelease")
+    if latest_release:
+        release_info = {
+            "Repository": f"{owner}/{repo}",
+            "Release Name": latest_release.get("name"),
+            "Tag Name": latest_release.get("tagName"),
+            "Published At": latest_release.get("publishedAt"),
+            "Author": (latest_release.get("author") or {}).get("login"),
+            "Is Pre-release": latest_release.get("isPrerelease"),
+            "Release URL": latest_release.get("url")
+        }
+        output_file_release = os.path.join(output_dir, f"{owner}_{repo}_latest_release.csv")
+        with open(output_file_release, 'w', newline='', encoding='utf-8') as csvfile:
+            fieldnames = list(release_info.keys())
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerow(release_info)
+        print(f"  - Saved latest release info to {output_file_release}")
+    else:
+        print(f"  - No latest release found for {owner}/{repo}.")
+
+    # --- 3. Get All Branches, paging through refs with the GraphQL cursor ---
     print(f"  - Fetching all branches for {owner}/{repo}...")
-    while True:
-        params = {"per_page": per_page, "page": page}
-        response = requests.get(branches_url, headers=headers, params=params, timeout=10)
-        if response.status_code == 200:
-            current_branches = response.json()
-            if not current_branches:
+    output_file_branches = os.path.join(output_dir, f"{owner}_{repo}_branches.csv")
+    branch_count = 0
+    with open(output_file_branches, 'w', newline='', encoding='utf-8') as csvfile:
+        fieldnames = ["Repository", "Branch Name", "Latest Commit SHA", "Protected", "URL"]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        refs = repo_data["refs"]
+        page = 1
+        while True:
+            writer.writerows(_branch_rows(refs["nodes"], base_url, f"{owner}/{repo}"))
+            branch_count += len(refs["nodes"])
+            print(f"    - Fetched {len(refs['nodes'])} branches from page {page}")
+            if page % CSV_FLUSH_EVERY_PAGES == 0:
+                csvfile.flush()
+
+            if not refs["pageInfo"]["hasNextPage"]:
                 break
-            for branch in current_branches:
-                all_branches_data.append({
-                    "Repository": f"{owner}/{repo}",
-                    "Branch Name": branch.get("name"),
-                    "Latest Commit SHA": branch.get("commit", {}).get("sha"),
-                    "Protected": branch.get("protected"),
-                    "URL": branch.get("commit", {}).get("url") # This URL links to commit details, useful for date
-                })
-            print(f"    - Fetched {len(current_branches)} branches from page {page}")
             page += 1
-        else:
-            print(f"  - Error fetching branches (HTTP {response.status_code}): {response.text}")
-            break
+            try:
+                refs = _query_branch_page(json_headers, owner, repo, refs["pageInfo"]["endCursor"])
+            except (urllib3.exceptions.HTTPError, ValueError) as e:
+                print(f"  - Error fetching branches page {page}: {e}")
+                break
 
-    if all_branches_data:
-        output_file_branches = os.path.join(output_dir, f"{owner}_{repo}_branches.csv")
-        with open(output_file_branches, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ["Repository", "Branch Name", "Latest Commit SHA", "Protected", "URL"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_branches_data)
-        print(f"  - Saved {len(all_branches_data)} branches to {output_file_branches}")
+    if branch_count:
+        print(f"  - Saved {branch_count} branches to {output_file_branches}")
     else:
+        os.remove(output_file_branches) # Don't leave a header-only CSV behind
         print(f"  - No branches found or could not retrieve for {owner}/{repo}.")
 
 # Example usage (can be moved to your main script's `if __name__ == "__main__":` block)
@@ -0,0 +1,230 @@
+# github_client.py
+import asyncio
+import httpx
+import importlib.util
+import json
+import re
+import time
+
+# orjson decodes GitHub's list payloads several times faster than the stdlib; it is optional here.
+# The audit scripts all go through loads_json/dumps_json/decode_json rather than importing orjson themselves.
+try:
+    import orjson
+    loads_json = orjson.loads
+    dumps_json = orjson.dumps
+except ImportError:
+    loads_json = json.loads # Also accepts bytes
+    def dumps_json(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_URL}/graphql"
+GITHUB_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28"
+}
+MAX_CONCURRENT_REQUESTS = 10 # In-flight request cap, to stay clear of GitHub's secondary rate limit
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None # httpx[http2] extra; otherwise pooled HTTP/1.1
+PER_PAGE = 100
+
+# Conditional requests answered with 304 Not Modified do not count against the primary rate limit,
+# so responses are remembered between runs as {url: {"etag", "status_code", "link", "body"}}.
+# Only URLs requested in the latest run are kept. Listed in .gitignore: the bodies are audit data.
+ETAG_CACHE_FILE = ".github_etag_cache.json"
+
+# Page number of the rel="last" entry in a GitHub Link header
+_LAST_PAGE_RE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+def parse_last_page(link_header: str) -> int | None:
+    """
+    Returns the last page number advertised in a Link header, or None if there is only one page.
+    """
+    match = _LAST_PAGE_RE.search(link_header or "")
+    return int(match.group(1)) if match else None
+
+def decode_json(response: httpx.Response):
+    """
+    Decodes a response body (httpx or requests). Raises json.JSONDecodeError (orjson's error subclasses it) on invalid JSON.
+    """
+    return loads_json(response.content)
+
+def _rate_limit_delay(response: httpx.Response) -> float | None:
+    """
+    Returns how long GitHub asked us to wait before retrying, or None if the response is not rate-limited.
+    A 403 without Retry-After or an exhausted X-RateLimit-Remaining is a permissions error, not a rate limit.
+    """
+    if response.status_code not in (403, 429):
+        return None
+    if response.headers.get("Retry-After"):
+        return float(response.headers["Retry-After"])
+    if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+        return max(0.0, int(response.headers["X-RateLimit-Reset"]) - time.time())
+    return None
+
+async def gather_or_cancel(*aws) -> list:
+    """
+    Like asyncio.gather, but if any awaitable raises, the others are cancelled before the
+    exception propagates instead of being left running (and issuing requests) in the background.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        await _cancel_pending(tasks)
+
+async def _cancel_pending(tasks) -> None:
+    """
+    Cancels the unfinished tasks and waits for them, so none outlives its caller and no
+    "exception was never retrieved" warnings are logged.
+    """
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+class GithubAPIError(Exception):
+    """
+    Raised for non-success REST responses and GraphQL errors. `response` is None for GraphQL errors.
+    """
+    def __init__(self, message: str, response: httpx.Response | None = None):
+        super().__init__(message)
+        self.response = response
+        self.status_code = response.status_code if response is not None else None
+
+class GithubClient:
+    """
+    Async GitHub API client shared by the audit scripts. One pooled (HTTP/2 when available)
+    connection set, a cap on in-flight requests, an on-disk ETag cache and rate-limit backoff
+    apply to every call.
+
+    Use as `async with GithubClient(token) as client:` so the connections are closed and
+    the ETag cache is saved when the audit finishes.
+    """
+    def __init__(self, token: str, *, timeout: float = 20, max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+                 etag_cache_file: str | None = ETAG_CACHE_FILE):
+        self._client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            headers={"Authorization": f"token {token}", **GITHUB_HEADERS},
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            timeout=timeout
+        )
+        self._sem = asyncio.Semaphore(max_concurrent_requests)
+        self._etag_cache_file = etag_cache_file
+        self._etag_cache = self._load_etag_cache()
+        self._etag_seen = set() # URLs requested this run; only these are saved, so the cache can't grow without bound
+
+    async def __aenter__(self) -> "GithubClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+        self._save_etag_cache()
+
+    def _load_etag_cache(self) -> dict:
+        if not self._etag_cache_file:
+            return {}
+        try:
+            with open(self._etag_cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_etag_cache(self) -> None:
+        # A run that made no REST GETs (e.g. GraphQL only) leaves the previous cache untouched
+        if not self._etag_cache_file or not self._etag_seen:
+            return
+        try:
+            with open(self._etag_cache_file, 'w', encoding='utf-8') as f:
+                json.dump({url: entry for url, entry in self._etag_cache.items() if url in self._etag_seen}, f)
+        except OSError as e:
+            print(f"Warning: could not save ETag cache {self._etag_cache_file}: {e}")
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request bounded by the semaphore. Rate-limited responses are retried once,
+        after the wait GitHub asks for.
+        """
+        async with self._sem:
+            response = await self._client.request(method, url, **kwargs)
+
+        delay = _rate_limit_delay(response)
+        if delay is not None:
+            print(f"  Rate limited by GitHub; retrying {url} in {delay:.0f}s...")
+            await asyncio.sleep(delay) # Sleep outside the semaphore so the slot isn't held idle
+            async with self._sem:
+                response = await self._client.request(method, url, **kwargs)
+        return response
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        """
+        GETs an API path (or absolute URL). Sends If-None-Match for previously seen URLs
+        and replays the cached response when GitHub answers 304 Not Modified.
+        """
+        key = str(self._client.build_request("GET", path, params=kwargs.get("params")).url)
+        self._etag_seen.add(key)
+        cached = self._etag_cache.get(key)
+        if cached:
+            kwargs["headers"] = {**kwargs.get("headers", {}), "If-None-Match": cached["etag"]}
+
+        response = await self._send("GET", path, **kwargs)
+
+        if response.status_code == 304 and cached:
+            return httpx.Response(
+                cached["status_code"],
+                text=cached["body"],
+                headers={"Link": cached["link"]} if cached["link"] else None,
+                request=response.request
+            )
+        if response.status_code in (200, 204) and response.headers.get("ETag"):
+            self._etag_cache[key] = {
+                "etag": response.headers["ETag"],
+                "status_code": response.status_code,
+                "link": response.headers.get("Link"),
+                "body": response.text
+            }
+        else:
+            self._etag_cache.pop(key, None) # Drop entries for URLs that now fail or stopped sending an ETag
+        return response
+
+    async def paginate(self, path: str, params: dict | None = None):
+        """
+        Yields every item of a paginated list endpoint, in page order. Page 1 reveals the page
+        count via its Link header; pages 2..last are then fetched concurrently.
+        Raises GithubAPIError on the first non-200 page, cancelling the fetches still in flight.
+        """
+        params = {**(params or {}), "per_page": PER_PAGE}
+        first = await self.get(path, params={**params, "page": 1})
+        if first.status_code != 200:
+            raise GithubAPIError(f"API error: {first.status_code} - {first.text}", first)
+        for item in decode_json(first):
+            yield item
+
+        last_page = parse_last_page(first.headers.get("Link", "")) or 1
+        pages = [asyncio.ensure_future(self.get(path, params={**params, "page": page})) for page in range(2, last_page + 1)]
+        try:
+            for next_page in pages: # Awaited in order so output (and CSV row order) is stable across runs
+                response = await next_page
+                if response.status_code != 200:
+                    raise GithubAPIError(f"API error: {response.status_code} - {response.text}", response)
+                for item in decode_json(response):
+                    yield item
+        finally:
+            # On an error page, or if the caller stops iterating early, don't leave the other page fetches running
+            await _cancel_pending(pages)
+
+    async def graphql(self, query: str, variables: dict, *, partial: bool = False) -> dict:
+        """
+        Runs a GraphQL query and returns its `data` object. Raises GithubAPIError on HTTP or GraphQL errors.
+        With partial=True, GraphQL errors are tolerated whenever `data` came back; fields that failed are null.
+        """
+        response = await self._send("POST", GITHUB_GRAPHQL_URL, json={"query": query, "variables": variables})
+        if response.status_code != 200:
+            raise GithubAPIError(f"API error: {response.status_code} - {response.text}", response)
+        payload = decode_json(response)
+        if payload.get("errors") and not (partial and payload.get("data")):
+            raise GithubAPIError(f"GraphQL error: {'; '.join(e.get('message', 'Unknown error') for e in payload['errors'])}")
+        return payload["data"]
@@ -1,9 +1,11 @@
 # graph_nodes.py
-import json
+import asyncio
+import re
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from tools.github_verifier import verify_github_token_api
+from _llm import get_llm
+from pydantic import BaseModel, Field
+from tools.github_verifier import verify_github_token_api, fetch_rate_limit, is_verification_cached
 from workflow_state import GithubTokenVerificationState
 import os
 from dotenv import load_dotenv
@@ -11,11 +13,17 @@ from dotenv import load_dotenv
 load_dotenv() # Load environment variables for LLM keys
 
 # Initialize LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0) # gpt-4o-mini is cost-effective for this
+llm = get_llm() # Shared gpt-4o-mini instance; cost-effective for this
 
-def call_github_verifier_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
+# Known GitHub token formats (classic/OAuth/user-to-server/server-to-server/refresh and fine-grained PATs)
+_PAT_RE = re.compile(r'^(ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9]{36,}$|^github_pat_[A-Za-z0-9_]{82,}$')
+
+async def call_github_verifier_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
     """
-    Node to call the GitHub token verification tool.
+    Node to call the GitHub token verification tool. On a cache miss, /user and
+    /rate_limit are requested concurrently, so the report has the rate-limit status
+    for 403s and LLM-analyzed outcomes at the cost of one round-trip. Cached results
+    (always 2xx or 401, which need no rate limit) cost no GitHub request at all.
     """
     print("Executing: call_github_verifier_node")
     token = state.get("token")
@@ -25,9 +33,21 @@ def call_github_verifier_node(state: GithubTokenVerificationState) -> GithubToke
         state["verification_result"] = {"valid": False, "message": "No token provided.", "status_code": 0}
         return state
 
+    if not _PAT_RE.match(token):
+        # Can never authenticate, so skip the GitHub round-trip entirely
+        print("Token does not match any known GitHub token format. Skipping API call.")
+        state["verification_result"] = {"valid": False, "scopes": [], "message": "Malformed token format", "status_code": 0}
+        return state
+
     try:
-        result_json = verify_github_token_api.run(token)
-        state["verification_result"] = json.loads(result_json)
+        if is_verification_cached(token):
+            state["verification_result"] = await verify_github_token_api.ainvoke(token)
+        else:
+            state["verification_result"], state["rate_limit"] = await asyncio.gather(
+                verify_github_token_api.ainvoke(token),
+                fetch_rate_limit(token)
+            )
+            print(f"Rate limit: {state['rate_limit']}")
         print(f"Verification result: {state['verification_result']}")
     except Exception as e:
         print(f"Error calling GitHub verifier tool: {e}")
@@ -39,74 +59,158 @@ def call_github_verifier_node(state: GithubTokenVerificationState) -> GithubToke
         }
     return state
 
-def analyze_result_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
+class TokenReport(BaseModel):
     """
-    Node for LLM to analyze the verification result and provide a concise summary.
+    Structured LLM output covering both the analysis and the remediation advice.
     """
-    print("Executing: analyze_result_node")
-    verification_result = state.get("verification_result", {})
-    is_valid = verification_result.get("valid")
-    message = verification_result.get("message")
-    scopes = verification_result.get("scopes")
-    status_code = verification_result.get("status_code")
+    analysis: str = Field(description="1-3 sentence summary of the verification outcome.")
+    remediation: str = Field(description="2-4 concrete remediation steps if the token is invalid, otherwise an empty string.")
 
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", "You are an AI assistant analyzing GitHub token verification results. "
-                   "Summarize the outcome concisely. State if the token is valid or invalid. "
-                   "If valid, list the scopes. If invalid, provide a brief, clear reason. "
-                   "Keep the summary to 1-3 sentences."),
-        ("human", f"GitHub Token Verification Result:\nValid: {is_valid}\nMessage: {message}\nScopes: {scopes}\nStatus Code: {status_code}")
-    ])
-    
-    chain = prompt_template | llm
-    
-    try:
-        analysis = chain.invoke({"input": ""}).content
-        state["analysis_message"] = analysis
-        print(f"Analysis: {analysis}")
-    except Exception as e:
-        print(f"Error during LLM analysis: {e}")
-        state["analysis_message"] = f"Error during analysis: {e}"
-    
-    return state
+# Prompt and chain are structurally constant, so build them once at import and fill variables per call
+REPORT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an AI assistant analyzing GitHub token verification results. "
+               "Respond with JSON containing two fields. "
+               "'analysis': summarize the outcome concisely in 1-3 sentences. State if the token is valid or invalid. "
+               "If valid, list the scopes. If invalid, provide a brief, clear reason. "
+               "'remediation': if the token is invalid, suggest 2-4 concrete, actionable steps to resolve the issue, "
+               "focusing on common problems like expiration, incorrect scopes, or network issues. "
+               "If the token is valid, return an empty string."),
+    ("human", "GitHub Token Verification Result:\nValid: {is_valid}\nMessage: {message}\nScopes: {scopes}\nStatus Code: {status_code}\n"
+              "Rate Limit Remaining: {rate_limit_remaining}")
+])
+REPORT_CHAIN = REPORT_PROMPT | llm.with_structured_output(TokenReport)
 
-def suggest_remediation_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
+def _report_inputs(state: GithubTokenVerificationState) -> dict:
     """
-    Node for LLM to suggest remediation steps if the token is invalid.
-    This node is only triggered if the token is found to be invalid.
+    Maps a verification result (and rate-limit status, if known) onto the REPORT_PROMPT variables.
     """
-    print("Executing: suggest_remediation_node")
-    verification_result = state.get("verification_result", {})
-    is_valid = verification_result.get("valid")
-    message = verification_result.get("message")
-    scopes = verification_result.get("scopes") # Will be empty if invalid
+    verification_result = state.get("verification_result") or {}
+    rate_limit = state.get("rate_limit") or {}
+    return {
+        "is_valid": verification_result.get("valid"),
+        "message": verification_result.get("message"),
+        "scopes": verification_result.get("scopes"),
+        "status_code": verification_result.get("status_code"),
+        "rate_limit_remaining": rate_limit.get("remaining", "unknown")
+    }
+
+# Known outcomes are just a restatement of the verification result, so they are formatted
+# locally; the LLM is only consulted for unexpected status codes.
+_STATIC_ANALYSIS = {
+    200: "Token is valid. Scopes: {scopes}.",
+    401: "Token is invalid or expired.",
+    403: "Token is forbidden or rate-limited: {message}.",
+    -1: "Request to GitHub timed out.",
+    0: "Token was rejected before contacting GitHub: {message}."
+}
+_STATIC_REMEDIATION = {
+    401: "1. Check that the token was copied in full and has not been revoked.\n"
+         "2. Check the token's expiration date in GitHub Developer settings.\n"
+         "3. Generate a new token with the required scopes and update it wherever it is stored.",
+    403: "1. If the rate limit is exhausted (remaining: {rate_limit_remaining}), wait for it to reset before retrying.\n"
+         "2. Make sure the token has the scopes required for the endpoint being called.\n"
+         "3. If the organization enforces SAML SSO, authorize the token for that organization.",
+    -1: "1. Check network connectivity to api.github.com.\n"
+        "2. Check https://www.githubstatus.com for ongoing incidents.\n"
+        "3. Retry the verification.",
+    0: "1. Make sure a token was supplied.\n"
+       "2. Check the token was copied in full; GitHub tokens start with ghp_, gho_, ghu_, ghs_, ghr_ or github_pat_.\n"
+       "3. Generate a new token if the original cannot be recovered."
+}
+
+def _static_report(state: GithubTokenVerificationState) -> TokenReport | None:
+    """
+    Returns a formatted TokenReport for well-known outcomes, or None if the LLM is needed.
+    """
+    verification_result = state.get("verification_result") or {}
     status_code = verification_result.get("status_code")
+    is_valid = verification_result.get("valid")
+    if status_code not in _STATIC_ANALYSIS or (not is_valid and status_code not in _STATIC_REMEDIATION):
+        return None
 
-    if is_valid:
-        state["remediation_suggestions"] = "Token is valid. No remediation needed."
-        return state
+    inputs = _report_inputs(state)
+    inputs["scopes"] = ", ".join(verification_result.get("scopes") or []) or "none"
+    return TokenReport(
+        analysis=_STATIC_ANALYSIS[status_code].format(**inputs),
+        remediation="" if is_valid else _STATIC_REMEDIATION[status_code].format(**inputs)
+    )
 
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", "You are an AI assistant providing practical remediation advice for GitHub token issues. "
-                   "Based on the error message and status code, suggest concrete, actionable steps to resolve the issue. "
-                   "Focus on common problems like expiration, incorrect scopes, or network issues. "
-                   "Provide 2-4 distinct suggestions."),
-        ("human", f"GitHub Token Invalid. Error Message: '{message}'. Status Code: {status_code}. "
-                   "What are the best steps to fix this token issue?")
-    ])
-    
-    chain = prompt_template | llm
+def _apply_report(state: GithubTokenVerificationState, report) -> None:
+    """
+    Copies an LLM TokenReport (or the exception raised while producing it) into the state.
+    """
+    if isinstance(report, Exception):
+        print(f"Error during LLM analysis: {report}")
+        state["analysis_message"] = f"Error during analysis: {report}"
+        state["remediation_suggestions"] = f"Error generating suggestions: {report}"
+        return
 
-    try:
-        suggestions = chain.invoke({"input": ""}).content
-        state["remediation_suggestions"] = suggestions
-        print(f"Remediation suggestions: {suggestions}")
-    except Exception as e:
-        print(f"Error during LLM remediation suggestion: {e}")
-        state["remediation_suggestions"] = f"Error generating suggestions: {e}"
-    
+    is_valid = (state.get("verification_result") or {}).get("valid")
+    state["analysis_message"] = report.analysis
+    state["remediation_suggestions"] = "Token is valid. No remediation needed." if is_valid else report.remediation
+    print(f"Analysis: {state['analysis_message']}")
+    print(f"Remediation suggestions: {state['remediation_suggestions']}")
+
+def analyze_result_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
+    """
+    Node to analyze the verification result and, if the token is invalid, suggest
+    remediation steps. Known outcomes are formatted locally; anything else is
+    handled by a single structured LLM call.
+    """
+    print("Executing: analyze_result_node")
+    report = _static_report(state)
+    if report is None:
+        try:
+            report = REPORT_CHAIN.invoke(_report_inputs(state))
+        except Exception as e:
+            report = e
+    _apply_report(state, report)
     return state
 
+async def analyze_results_batch(states: list[GithubTokenVerificationState]) -> list[GithubTokenVerificationState]:
+    """
+    Batched equivalent of analyze_result_node: results that need the LLM are sent
+    through a single llm.abatch() call instead of one request per token.
+    """
+    print(f"Executing: analyze_results_batch ({len(states)} results)")
+    needs_llm = []
+    for state in states:
+        report = _static_report(state)
+        if report is None:
+            needs_llm.append(state)
+        else:
+            _apply_report(state, report)
+
+    if needs_llm:
+        reports = await REPORT_CHAIN.abatch([_report_inputs(state) for state in needs_llm], return_exceptions=True)
+        for state, report in zip(needs_llm, reports):
+            _apply_report(state, report)
+    return states
+
+async def verify_tokens_batch(tokens: list[str], max_concurrency: int = 16) -> list[GithubTokenVerificationState]:
+    """
+    Verifies many tokens at once: GitHub checks fan out concurrently (bounded by
+    max_concurrency), then the LLM analysis for the whole batch is done in one abatch call.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _verify(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
+        async with sem:
+            return await call_github_verifier_node(state)
+
+    states = [
+        GithubTokenVerificationState(
+            token=token,
+            verification_result=None,
+            rate_limit=None,
+            analysis_message=None,
+            remediation_suggestions=None
+        )
+        for token in tokens
+    ]
+    states = await asyncio.gather(*[_verify(state) for state in states])
+    return await analyze_results_batch(list(states))
+
 # Define a human-in-the-loop node (optional but good for review)
 def human_review_node(state: GithubTokenVerificationState) -> GithubTokenVerificationState:
     """
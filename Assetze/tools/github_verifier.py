@@ -1,15 +1,127 @@
 # tools/github_verifier.py
-import requests
+import asyncio
+import httpx
+import hashlib
 import json
+import os
+import threading
+import time
 from langchain_core.tools import tool
+from github_client import HTTP2_AVAILABLE, decode_json
+
+# Cache of definitive verification results, keyed by sha256(token) so raw tokens are never held in memory
+_CACHE: dict[str, tuple[dict, float]] = {}
+_CACHE_LOCK = threading.Lock()
+_CACHE_TTL = float(os.getenv("GITHUB_TOKEN_CACHE_TTL", "300"))
+
+def _cache_get(key: str) -> dict | None:
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if time.monotonic() > expires_at:
+            del _CACHE[key]
+            return None
+        return dict(result) # Copy so callers can't mutate the cached entry
+
+def _cache_put(key: str, result: dict) -> None:
+    with _CACHE_LOCK:
+        _CACHE[key] = (dict(result), time.monotonic() + _CACHE_TTL)
+
+# Shared async client so repeated verifications reuse pooled connections and TLS sessions
+_CLIENT: httpx.AsyncClient | None = None
+_CLIENT_LOOP: asyncio.AbstractEventLoop | None = None
+# Caps concurrent in-flight GitHub requests to stay clear of the secondary rate limit
+_MAX_CONCURRENT_REQUESTS = 8
+_SEMAPHORE: asyncio.Semaphore | None = None
+# All requests go to api.github.com, so one multiplexed HTTP/2 connection carries them when `h2` is installed
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client, recreating it if the running event loop has changed
+    (e.g. successive asyncio.run() calls from the CLI workflow). Callers that run their
+    own loop should await aclose_client() before it ends; a client left behind by a
+    closed loop can't be closed from here, so it is closed best-effort and discarded.
+    """
+    global _CLIENT, _CLIENT_LOOP, _SEMAPHORE
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _CLIENT.is_closed or _CLIENT_LOOP is not loop:
+        if _CLIENT is not None and not _CLIENT.is_closed and _CLIENT_LOOP is not None and not _CLIENT_LOOP.is_closed():
+            # Owning loop is still alive (e.g. another thread's loop): close the client there
+            asyncio.run_coroutine_threadsafe(_CLIENT.aclose(), _CLIENT_LOOP)
+        _CLIENT = httpx.AsyncClient(timeout=10, http2=HTTP2_AVAILABLE, limits=_LIMITS)
+        _CLIENT_LOOP = loop
+        _SEMAPHORE = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
+    return _CLIENT
+
+async def _github_get(url: str, headers: dict) -> httpx.Response:
+    """
+    GETs a GitHub API URL through the shared client, bounded by the request semaphore.
+    """
+    client = _get_client()
+    async with _SEMAPHORE:
+        return await client.get(url, headers=headers)
+
+async def fetch_rate_limit(token: str) -> dict | None:
+    """
+    Returns the core REST rate-limit status ({"limit", "remaining", "reset"}) for the token,
+    or None if it could not be determined. Calls to /rate_limit do not count against the limit.
+    """
+    headers = {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+    try:
+        response = await _github_get("https://api.github.com/rate_limit", headers)
+        if response.status_code != 200:
+            return None
+        core = decode_json(response).get("resources", {}).get("core", {})
+        return {"limit": core.get("limit"), "remaining": core.get("remaining"), "reset": core.get("reset")}
+    except (httpx.HTTPError, json.JSONDecodeError):
+        return None
+
+async def aclose_client() -> None:
+    """
+    Closes the shared client. Call on application shutdown.
+    """
+    global _CLIENT, _CLIENT_LOOP
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+    _CLIENT = None
+    _CLIENT_LOOP = None
+
+def is_verification_cached(token: str) -> bool:
+    """
+    True if verify_github_token_api would answer from its cache, without calling GitHub.
+    """
+    return _cache_get(hashlib.sha256(token.encode()).hexdigest()) is not None
 
 @tool
-def verify_github_token_api(token: str) -> str:
+async def verify_github_token_api(token: str) -> dict:
     """
     Verifies a GitHub personal access token by attempting a simple API call
-    and returns its validity, scopes, and a message as a JSON string.
+    and returns its validity, scopes, and a message as a dict.
     Input is the GitHub token string.
     """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    result = await _averify(token)
+
+    # Only pin definitive answers; timeouts, 5xx and network errors should be retried next time
+    status_code = result["status_code"]
+    if 200 <= status_code < 300 or status_code == 401:
+        _cache_put(key, result)
+    return result
+
+async def _averify(token: str) -> dict:
+    """
+    Performs the GitHub API call and maps the response to a result dict.
+    """
     api_url = "https://api.github.com/user"
     headers = {
         "Authorization": f"token {token}",
@@ -17,10 +129,10 @@ def verify_github_token_api(token: str) -> str:
     }
 
     try:
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = await _github_get(api_url, headers)
         response_data = {}
         try:
-            response_data = response.json()
+            response_data = decode_json(response)
         except json.JSONDecodeError:
             # Handle cases where response might not be JSON (e.g., HTML error pages)
             response_data = {"message": response.text[:200] + "..." if response.text else "No JSON response body"}
@@ -61,14 +173,14 @@ def verify_github_token_api(token: str) -> str:
                 "message": f"Unexpected API response (Status: {response.status_code}): {response_data.get('message', 'No message')}",
                 "status_code": response.status_code
             }
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         result = {
             "valid": False,
             "scopes": [],
             "message": "Request timed out when connecting to GitHub API.",
             "status_code": -1
         }
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         result = {
             "valid": False,
             "scopes": [],
@@ -82,4 +194,4 @@ def verify_github_token_api(token: str) -> str:
             "message": f"An unexpected error occurred during tool execution: {e}",
             "status_code": -99
         }
-    return json.dumps(result)
\ No newline at end of file
+    return result
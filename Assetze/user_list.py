@@ -1,124 +1,138 @@
-import requests
-import os
+import asyncio
 import csv
 import datetime
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GITHUB_API_URL = "https://api.github.com"
-GITHUB_HEADERS = {
-    "Accept": "application/vnd.github+json",
-    "X-GitHub-Api-Version": "2022-11-28"
+import os
+from github_client import GithubClient
+from audit_config import AuditConfig
+
+ORG_HEADERS = ["Organization", "Username", "Role"]
+TEAM_HEADERS = ["Organization", "Team Name", "Username", "Team Role"]
+
+# Org members and teams (with up to 100 members each) in one query; each connection is dropped
+# from the query via @include once its cursor is exhausted
+ORG_AUDIT_QUERY = """
+query($o: String!, $mc: String, $tc: String, $withMembers: Boolean!, $withTeams: Boolean!) {
+  organization(login: $o) {
+    membersWithRole(first: 100, after: $mc) @include(if: $withMembers) {
+      pageInfo { hasNextPage endCursor }
+      edges { role node { login } }
+    }
+    teams(first: 50, after: $tc) @include(if: $withTeams) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        slug
+        members(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          edges { role node { login } }
+        }
+      }
+    }
+  }
 }
-
-
-def fetch_paginated(endpoint, token):
-    """Helper to fetch paginated API results."""
-    results = []
-    page = 1
-    headers = {"Authorization": f"token {token}", **GITHUB_HEADERS}
-
-    while True:
-        resp = requests.get(f"{endpoint}?page={page}&per_page=100", headers=headers, timeout=15)
-        if resp.status_code != 200:
-            raise Exception(f"API error: {resp.status_code} - {resp.text}")
-        data = resp.json()
-        if not data:
-            break
-        results.extend(data)
-        if 'Link' not in resp.headers or 'rel="next"' not in resp.headers['Link']:
-            break
-        page += 1
-
-    return results
-
-
-def fetch_org_members(org, token):
-    """Fetch org members and their roles."""
-    print(f"Fetching organization members for: {org}")
-    endpoint = f"{GITHUB_API_URL}/orgs/{org}/members"
-    members = fetch_paginated(endpoint, token)
-
-    member_roles = []
-    for member in members:
-        username = member.get("login")
-        role_endpoint = f"{GITHUB_API_URL}/orgs/{org}/memberships/{username}"
-        resp = requests.get(role_endpoint, headers={"Authorization": f"token {token}", **GITHUB_HEADERS}, timeout=10)
-        role = "unknown"
-        if resp.status_code == 200:
-            role = resp.json().get("role", "unknown")
-        member_roles.append({
-            "Organization": org,
-            "Username": username,
-            "Role": role
-        })
-
-    return member_roles
-
-
-def fetch_team_members(org, token):
-    """Fetch teams and their members/roles."""
-    print(f"Fetching teams for: {org}")
-    teams_endpoint = f"{GITHUB_API_URL}/orgs/{org}/teams"
-    teams = fetch_paginated(teams_endpoint, token)
-
-    team_roles = []
-    for team in teams:
-        slug = team.get("slug")
-        name = team.get("name")
-        print(f"  Fetching members for team: {name} ({slug})")
-
-        members_endpoint = f"{GITHUB_API_URL}/orgs/{org}/teams/{slug}/memberships"
-        members = fetch_paginated(members_endpoint, token)
-
-        for member in members:
-            username = member.get("user", {}).get("login")
-            role = member.get("role", "member")
-            team_roles.append({
-                "Organization": org,
-                "Team Name": name,
-                "Username": username,
-                "Team Role": role
-            })
-
-    return team_roles
-
-
-def write_csv(filename, data, headers):
-    """Write data to CSV file."""
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
-    print(f"✅ Data written to {filename}")
-
-
-if __name__ == "__main__":
-    github_token = os.getenv("GITHUB_TOKEN")
-    github_org = os.getenv("GITHUB_ORGANIZATION")
-    prefix = os.getenv("OUTPUT_CSV_PREFIX", "github_audit")
-
-    if not github_token or not github_org:
+"""
+
+TEAM_MEMBERS_QUERY = """
+query($o: String!, $slug: String!, $c: String) {
+  organization(login: $o) {
+    team(slug: $slug) {
+      members(first: 100, after: $c) {
+        pageInfo { hasNextPage endCursor }
+        edges { role node { login } }
+      }
+    }
+  }
+}
+"""
+
+
+async def _remaining_team_members(client, org, team):
+    """Page through the rest of a team's members; no requests for teams that fit in the first 100."""
+    edges = []
+    page_info = team["members"]["pageInfo"]
+    while page_info["hasNextPage"]:
+        data = await client.graphql(TEAM_MEMBERS_QUERY, {"o": org, "slug": team["slug"], "c": page_info["endCursor"]})
+        members = data["organization"]["team"]["members"]
+        edges.extend(members["edges"])
+        page_info = members["pageInfo"]
+    return edges
+
+
+async def fetch_org_audit(client, org):
+    """Yield (org_member_rows, team_member_rows) batches from a single walk of the org's members and teams."""
+    print(f"Fetching organization members and teams for: {org}")
+    variables = {"o": org, "mc": None, "tc": None, "withMembers": True, "withTeams": True}
+
+    while variables["withMembers"] or variables["withTeams"]:
+        data = await client.graphql(ORG_AUDIT_QUERY, variables)
+        organization = data.get("organization")
+        if organization is None:
+            raise Exception(f"Organization '{org}' not found or not accessible.")
+
+        org_rows = []
+        if variables["withMembers"]:
+            members = organization["membersWithRole"]
+            # (Organization, Username, Role); ADMIN/MEMBER -> admin/member, matching the REST values
+            org_rows = [(org, edge["node"]["login"], edge["role"].lower()) for edge in members["edges"]]
+            variables["withMembers"] = members["pageInfo"]["hasNextPage"]
+            variables["mc"] = members["pageInfo"]["endCursor"]
+
+        team_rows = []
+        if variables["withTeams"]:
+            teams = organization["teams"]
+            # Only teams with more than 100 members need follow-up requests; fetch those concurrently
+            overflow = await asyncio.gather(*[_remaining_team_members(client, org, team) for team in teams["nodes"]])
+            for team, extra_edges in zip(teams["nodes"], overflow):
+                print(f"  Team: {team['name']} ({team['slug']})")
+                for edge in team["members"]["edges"] + extra_edges:
+                    # (Organization, Team Name, Username, Team Role); MAINTAINER/MEMBER -> maintainer/member
+                    team_rows.append((org, team["name"], edge["node"]["login"], edge["role"].lower()))
+            variables["withTeams"] = teams["pageInfo"]["hasNextPage"]
+            variables["tc"] = teams["pageInfo"]["endCursor"]
+
+        yield org_rows, team_rows
+
+
+async def main():
+    cfg = AuditConfig.from_env(default_prefix="github_audit")
+
+    if not cfg.token or not cfg.org:
         print("❌ Please set GITHUB_TOKEN and GITHUB_ORGANIZATION in your .env file.")
         exit(1)
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    # Org members & roles
-    try:
-        org_members = fetch_org_members(github_org, github_token)
-        org_filename = f"{prefix}_{github_org}_org_members_{timestamp}.csv"
-        write_csv(org_filename, org_members, ["Organization", "Username", "Role"])
-    except Exception as e:
-        print(f"Error fetching org members: {e}")
-
-    # Team members & roles
-    try:
-        team_members = fetch_team_members(github_org, github_token)
-        team_filename = f"{prefix}_{github_org}_team_members_{timestamp}.csv"
-        write_csv(team_filename, team_members, ["Organization", "Team Name", "Username", "Team Role"])
-    except Exception as e:
-        print(f"Error fetching team members: {e}")
+    org_filename = f"{cfg.prefix}_{cfg.org}_org_members_{timestamp}.csv"
+    team_filename = f"{cfg.prefix}_{cfg.org}_team_members_{timestamp}.csv"
+
+    # Rows stream into .partial files that are renamed only once the whole walk succeeds,
+    # so a failed run leaves no header-only or truncated CSVs behind
+    org_partial = f"{org_filename}.partial"
+    team_partial = f"{team_filename}.partial"
+
+    async with GithubClient(cfg.token) as client:
+        # Org and team members & roles, both CSVs written as each page of the shared walk arrives
+        try:
+            with open(org_partial, 'w', newline='', encoding='utf-8') as org_f, \
+                 open(team_partial, 'w', newline='', encoding='utf-8') as team_f:
+                org_writer = csv.writer(org_f)
+                team_writer = csv.writer(team_f)
+                org_writer.writerow(ORG_HEADERS)
+                team_writer.writerow(TEAM_HEADERS)
+                async for org_rows, team_rows in fetch_org_audit(client, cfg.org):
+                    org_writer.writerows(org_rows)
+                    team_writer.writerows(team_rows)
+            os.replace(org_partial, org_filename)
+            os.replace(team_partial, team_filename)
+            print(f"✅ Data written to {org_filename}")
+            print(f"✅ Data written to {team_filename}")
+        except Exception as e:
+            print(f"Error fetching org and team members: {e}")
+            for partial in (org_partial, team_partial):
+                if os.path.exists(partial):
+                    os.remove(partial)
 
     print("\n🎯 Done. Make sure your token has at least `read:org` scope.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -2,6 +2,11 @@
 import requests
 from langchain.tools import tool
 import json
+from github_client import dumps_json
+
+# Shared session so repeated tool calls (e.g. in an agent loop) reuse the pooled TLS connection to api.github.com
+_SESSION = requests.Session()
+_SESSION.headers.update({"Accept": "application/vnd.github.v3+json"})
 
 @tool
 def verify_github_token_tool(token: str) -> str:
@@ -10,13 +15,10 @@ def verify_github_token_tool(token: str) -> str:
     Input is the GitHub token string.
     """
     api_url = "https://api.github.com/user"
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+    headers = {"Authorization": f"token {token}"}
 
     try:
-        response = requests.get(api_url, headers=headers)
+        response = _SESSION.get(api_url, headers=headers, timeout=10) # Never hang the calling agent
         response_data = response.json()
 
         if response.status_code == 200:
@@ -70,7 +72,7 @@ def verify_github_token_tool(token: str) -> str:
             "message": f"An unexpected error occurred: {e}",
             "status_code": -4
         }
-    return json.dumps(result)
+    return dumps_json(result).decode()
 
 if __name__ == '__main__':
     # Example usage for testing the tool function directly
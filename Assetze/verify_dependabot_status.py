@@ -1,26 +1,19 @@
-import requests
-import os
+import asyncio
+import httpx
 import json
 import csv
 import datetime
-from dotenv import load_dotenv
+from github_client import GithubClient, GithubAPIError, decode_json, gather_or_cancel
+from audit_config import AuditConfig
 
-# Load environment variables from .env file
-load_dotenv()
-
-# --- Common Headers for GitHub API ---
-GITHUB_API_HEADERS = {
-    "Accept": "application/vnd.github.com+json",
-    "X-GitHub-Api-Version": "2022-11-28"
-}
+DEPENDABOT_BATCH_SIZE = 50 # Repositories aliased into each batched GraphQL query
 
 # --- Function to Verify Dependabot Status (Existing, with minor refinement) ---
-def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
+async def verify_dependabot_status(client: GithubClient, owner: str, repo: str) -> dict:
     """
     Checks if Dependabot vulnerability alerts are enabled for a given GitHub repository.
     """
-    api_url = f"https://api.github.com/repos/{owner}/{repo}/vulnerability-alerts"
-    headers = {"Authorization": f"token {token}", **GITHUB_API_HEADERS}
+    api_url = f"/repos/{owner}/{repo}/vulnerability-alerts"
 
     print(f"Checking Dependabot status for: {owner}/{repo}...")
 
@@ -35,7 +28,7 @@ def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
     }
 
     try:
-        response = requests.get(api_url, headers=headers, timeout=15)
+        response = await client.get(api_url)
 
         if response.status_code == 204:
             result["enabled"] = True
@@ -48,7 +41,7 @@ def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
             result["message"] = f"Dependabot vulnerability alerts are DISABLED for {owner}/{repo} or repository not found."
             result["status_code"] = response.status_code
         elif response.status_code == 403:
-            error_message = response.json().get("message", "Forbidden: Check token scope or access.")
+            error_message = decode_json(response).get("message", "Forbidden: Check token scope or access.")
             result["enabled"] = False
             result["status_text"] = "Error: Forbidden"
             result["message"] = f"Forbidden: {error_message}. Check token scopes ('repo' or 'public_repo') and access."
@@ -56,7 +49,7 @@ def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
         else:
             error_details_msg = f"Unexpected HTTP status code: {response.status_code}"
             try:
-                response_json = response.json()
+                response_json = decode_json(response)
                 if "message" in response_json:
                     error_details_msg += f" - Message: {response_json['message']}"
             except json.JSONDecodeError:
@@ -67,17 +60,17 @@ def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
             result["message"] = f"Could not determine Dependabot status: {error_details_msg}"
             result["status_code"] = response.status_code
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         result["status_text"] = "Error: Timeout"
         result["message"] = "Request timed out when connecting to GitHub API. Check network or API availability."
         result["status_code"] = -1
         result["error_details"] = "Timeout"
-    except requests.exceptions.ConnectionError as e:
+    except httpx.ConnectError as e:
         result["status_text"] = "Error: Connection"
         result["message"] = f"Network connection error: Could not reach GitHub API. Details: {e}"
         result["status_code"] = -2
         result["error_details"] = str(e)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         result["status_text"] = "Error: Request Failed"
         result["message"] = f"An error occurred during the API request: {e}"
         result["status_code"] = -3
@@ -90,54 +83,105 @@ def verify_dependabot_status(token: str, owner: str, repo: str) -> dict:
     
     return result
 
+# --- Batched Dependabot Status via GraphQL ---
+def _dependabot_batch_query(count: int) -> str:
+    """
+    Builds one query with an aliased repository(...) { hasVulnerabilityAlertsEnabled } field per repository.
+    Owner/name are passed as variables ($o0/$n0, $o1/$n1, ...) rather than interpolated into the query.
+    """
+    params = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(count))
+    fields = " ".join(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ hasVulnerabilityAlertsEnabled }}" for i in range(count))
+    return f"query({params}) {{ {fields} }}"
+
+async def _verify_dependabot_chunk(client: GithubClient, chunk: list[tuple[str, str]]) -> list[dict]:
+    """
+    Checks up to DEPENDABOT_BATCH_SIZE repositories with a single GraphQL request. Repositories the
+    query could not answer (not found, no access) fall back to the REST check for a precise error.
+    """
+    variables = {}
+    for i, (owner, repo) in enumerate(chunk):
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = repo
+
+    try:
+        data = await client.graphql(_dependabot_batch_query(len(chunk)), variables, partial=True)
+    except (GithubAPIError, httpx.HTTPError) as e:
+        print(f"Batched Dependabot query failed ({e}). Checking these repositories one by one.")
+        data = {}
+
+    results = [None] * len(chunk)
+    fallback = []
+    for i, (owner, repo) in enumerate(chunk):
+        enabled = (data.get(f"r{i}") or {}).get("hasVulnerabilityAlertsEnabled")
+        if enabled is None:
+            fallback.append(i)
+            continue
+        # Report exactly what the REST check would have (204 / 404), so the CSV doesn't depend on which path answered
+        if enabled:
+            status_text, message, status_code = "Enabled", f"Dependabot vulnerability alerts are ENABLED for {owner}/{repo}.", 204
+        else:
+            status_text = "Disabled/Not Found"
+            message = f"Dependabot vulnerability alerts are DISABLED for {owner}/{repo} or repository not found."
+            status_code = 404
+        results[i] = {
+            "owner": owner,
+            "repo_name": repo,
+            "enabled": enabled,
+            "status_text": status_text,
+            "message": message,
+            "status_code": status_code,
+            "error_details": ""
+        }
+
+    fallback_results = await asyncio.gather(*[verify_dependabot_status(client, *chunk[i]) for i in fallback])
+    for i, result in zip(fallback, fallback_results):
+        results[i] = result
+    return results
+
+async def verify_dependabot_status_batch(client: GithubClient, repositories: list[tuple[str, str]]) -> list[dict]:
+    """
+    Checks Dependabot vulnerability alerts for many (owner, repo) pairs, one GraphQL request per
+    DEPENDABOT_BATCH_SIZE repositories instead of one REST request each. Results keep the input order
+    and have the same shape as verify_dependabot_status().
+    """
+    print(f"Checking Dependabot status for {len(repositories)} repositories in batches of {DEPENDABOT_BATCH_SIZE}...")
+    repositories = list(repositories)
+    chunks = [repositories[i:i + DEPENDABOT_BATCH_SIZE] for i in range(0, len(repositories), DEPENDABOT_BATCH_SIZE)]
+    chunk_results = await asyncio.gather(*[_verify_dependabot_chunk(client, chunk) for chunk in chunks])
+    return [result for results in chunk_results for result in results]
+
 # --- Function to Get Organization Member Roles (Existing) ---
-def get_organization_roles_to_csv(token: str, organization_name: str, output_prefix: str = "github_org_roles") -> bool:
+async def get_organization_roles_to_csv(client: GithubClient, organization_name: str, timestamp: str, output_prefix: str = "github_org_roles") -> bool:
     """
     Fetches all members and their overall organization roles for a given GitHub organization and saves to a CSV.
     Returns True if data was successfully fetched and written, False otherwise.
     """
     print(f"\n--- Fetching overall roles for organization: {organization_name} ---")
     members_data = []
-    page = 1
-    per_page = 100
-    headers = {"Authorization": f"token {token}", **GITHUB_API_HEADERS}
     org_roles_auditable = False # Flag for summary report
 
     try:
-        while True:
-            api_url = f"https://api.github.com/orgs/{organization_name}/members?page={page}&per_page={per_page}"
-            print(f"  Fetching page {page} from {api_url}...")
-            response = requests.get(api_url, headers=headers, timeout=20)
-
-            if response.status_code == 200:
-                current_page_members = response.json()
-                if not current_page_members:
-                    break
-
-                for member in current_page_members:
-                    members_data.append({
-                        "Organization": organization_name,
-                        "Username": member.get("login"),
-                        "Role": member.get("role")
-                    })
-                
-                if 'Link' in response.headers and 'rel="next"' in response.headers['Link']:
-                    page += 1
-                else:
-                    break
-            elif response.status_code == 403:
-                error_msg = response.json().get("message", "Forbidden: Check token scope or organization access.")
-                print(f"Error 403: {error_msg}")
-                print("  Ensure your GitHub token has 'read:org' scope for this organization.")
-                break
-            elif response.status_code == 404:
-                print(f"Error 404: Organization '{organization_name}' not found or no members accessible.")
-                break
-            else:
-                print(f"Unexpected HTTP status code {response.status_code}: {response.text}")
-                break
-
-    except requests.exceptions.RequestException as e:
+        api_url = f"/orgs/{organization_name}/members"
+        print(f"  Fetching all pages from {api_url}...")
+
+        # The members endpoint carries no role field, so list admins and members separately and tag rows with it
+        async def _members_with_role(role: str) -> list[tuple]:
+            # Rows are tuples in csv_headers order, written with csv.writer (no per-row dict lookups)
+            return [(organization_name, member.get("login"), role) async for member in client.paginate(api_url, {"role": role})]
+
+        for rows in await gather_or_cancel(_members_with_role("admin"), _members_with_role("member")):
+            members_data.extend(rows)
+
+    except GithubAPIError as e:
+        if e.status_code == 403:
+            error_msg = decode_json(e.response).get("message", "Forbidden: Check token scope or organization access.")
+            print(f"Error 403: {error_msg}")
+            print("  Ensure your GitHub token has 'read:org' scope for this organization.")
+        elif e.status_code == 404:
+            print(f"Error 404: Organization '{organization_name}' not found or no members accessible.")
+        else:
+            print(f"Unexpected HTTP status code {e.status_code}: {e.response.text}")
+    except httpx.HTTPError as e:
         print(f"Network or API request error while fetching organization roles: {e}")
     except Exception as e:
         print(f"An unexpected error occurred while fetching organization roles: {e}")
@@ -147,7 +191,6 @@ def get_organization_roles_to_csv(token: str, organization_name: str, output_pre
         return False # Indicate failure to audit roles
 
     # Generate a unique CSV filename
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = f"{output_prefix}_{organization_name}_org_roles_{timestamp}.csv" # Specific filename
 
     csv_headers = ["Organization", "Username", "Role"]
@@ -155,8 +198,8 @@ def get_organization_roles_to_csv(token: str, organization_name: str, output_pre
     print(f"--- Writing overall organization roles to {csv_filename} ---")
     try:
         with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-            writer.writeheader()
+            writer = csv.writer(csvfile)
+            writer.writerow(csv_headers)
             writer.writerows(members_data)
         print(f"Successfully wrote overall organization roles to {csv_filename}")
         org_roles_auditable = True
@@ -167,8 +210,44 @@ def get_organization_roles_to_csv(token: str, organization_name: str, output_pre
     
     return org_roles_auditable
 
+# --- Helper: Members of a Single Team ---
+async def _fetch_team_member_rows(client: GithubClient, organization_name: str, team: dict) -> list[tuple]:
+    """
+    Fetches the members of one team as CSV row tuples. Errors are reported and yield whatever rows were collected.
+    """
+    team_members_data = []
+    team_slug = team.get("slug")
+    team_name = team.get("name")
+    print(f"  Fetching members for team: {team_name} ({team_slug})...")
+
+    team_members_url = f"/orgs/{organization_name}/teams/{team_slug}/members"
+
+    # The members endpoint carries no role field, so list each role separately and tag rows with it
+    async def _members_with_role(role: str) -> list[tuple]:
+        # (Organization, Team Name, Username, Team Role)
+        return [
+            (organization_name, team_name, member.get("login"), role)
+            async for member in client.paginate(team_members_url, {"role": role})
+        ]
+
+    try:
+        for rows in await gather_or_cancel(_members_with_role("maintainer"), _members_with_role("member")):
+            team_members_data.extend(rows)
+    except GithubAPIError as e:
+        if e.status_code == 403:
+            error_msg = decode_json(e.response).get("message", "Forbidden: Check token scope.")
+            print(f"Error 403 fetching members for team {team_name}: {error_msg}")
+        else:
+            print(f"Unexpected HTTP status code {e.status_code} for team {team_name} members: {e.response.text}")
+    except httpx.HTTPError as e:
+        print(f"Network or API request error fetching members for team {team_name}: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred fetching members for team {team_name}: {e}")
+
+    return team_members_data
+
 # --- NEW: Function to Get Team Member Roles ---
-def get_team_member_roles_to_csv(token: str, organization_name: str, output_prefix: str = "github_team_roles") -> bool:
+async def get_team_member_roles_to_csv(client: GithubClient, organization_name: str, timestamp: str, output_prefix: str = "github_team_roles") -> bool:
     """
     Fetches all teams and their members with their roles within each team, then saves to a CSV.
     Requires 'read:org' scope.
@@ -178,36 +257,21 @@ def get_team_member_roles_to_csv(token: str, organization_name: str, output_pref
     team_members_data = []
     
     # First, get all teams in the organization
-    teams_url = f"https://api.github.com/orgs/{organization_name}/teams"
-    headers = {"Authorization": f"token {token}", **GITHUB_API_HEADERS}
+    teams_url = f"/orgs/{organization_name}/teams"
     
-    teams_page = 1
-    teams = []
-
     try:
-        while True:
-            response = requests.get(f"{teams_url}?page={teams_page}&per_page=100", headers=headers, timeout=20)
-            if response.status_code == 200:
-                current_teams = response.json()
-                if not current_teams:
-                    break
-                teams.extend(current_teams)
-                if 'Link' in response.headers and 'rel="next"' in response.headers['Link']:
-                    teams_page += 1
-                else:
-                    break
-            elif response.status_code == 403:
-                error_msg = response.json().get("message", "Forbidden: Check token scope or organization access.")
-                print(f"Error 403 fetching teams: {error_msg}")
-                print("  Ensure your GitHub token has 'read:org' scope for this organization.")
-                return False
-            elif response.status_code == 404:
-                print(f"Error 404 fetching teams: Organization '{organization_name}' not found or no teams accessible.")
-                return False
-            else:
-                print(f"Unexpected HTTP status code {response.status_code} fetching teams: {response.text}")
-                return False
-    except requests.exceptions.RequestException as e:
+        teams = [team async for team in client.paginate(teams_url)]
+    except GithubAPIError as e:
+        if e.status_code == 403:
+            error_msg = decode_json(e.response).get("message", "Forbidden: Check token scope or organization access.")
+            print(f"Error 403 fetching teams: {error_msg}")
+            print("  Ensure your GitHub token has 'read:org' scope for this organization.")
+        elif e.status_code == 404:
+            print(f"Error 404 fetching teams: Organization '{organization_name}' not found or no teams accessible.")
+        else:
+            print(f"Unexpected HTTP status code {e.status_code} fetching teams: {e.response.text}")
+        return False
+    except httpx.HTTPError as e:
         print(f"Network or API request error while fetching teams: {e}")
         return False
     except Exception as e:
@@ -218,53 +282,18 @@ def get_team_member_roles_to_csv(token: str, organization_name: str, output_pref
         print(f"No teams found for organization '{organization_name}'. Skipping team member roles CSV creation.")
         return False
 
-    # Now, for each team, get its members
-    for team in teams:
-        team_slug = team.get("slug")
-        team_name = team.get("name")
-        print(f"  Fetching members for team: {team_name} ({team_slug})...")
-        
-        members_page = 1
-        team_members_url = f"https://api.github.com/orgs/{organization_name}/teams/{team_slug}/members"
-        
-        try:
-            while True:
-                member_response = requests.get(f"{team_members_url}?page={members_page}&per_page=100", headers=headers, timeout=20)
-                if member_response.status_code == 200:
-                    current_members = member_response.json()
-                    if not current_members:
-                        break
-                    
-                    for member in current_members:
-                        team_members_data.append({
-                            "Organization": organization_name,
-                            "Team Name": team_name,
-                            "Username": member.get("login"),
-                            "Team Role": member.get("role") # 'member' or 'maintainer'
-                        })
-                    
-                    if 'Link' in member_response.headers and 'rel="next"' in member_response.headers['Link']:
-                        members_page += 1
-                    else:
-                        break
-                elif member_response.status_code == 403:
-                    error_msg = member_response.json().get("message", "Forbidden: Check token scope.")
-                    print(f"Error 403 fetching members for team {team_name}: {error_msg}")
-                    break # Stop processing this team
-                else:
-                    print(f"Unexpected HTTP status code {member_response.status_code} for team {team_name} members: {member_response.text}")
-                    break # Stop processing this team
-        except requests.exceptions.RequestException as e:
-            print(f"Network or API request error fetching members for team {team_name}: {e}")
-        except Exception as e:
-            print(f"An unexpected error occurred fetching members for team {team_name}: {e}")
+    # Teams are independent, so fetch their members concurrently (bounded by the client's request cap)
+    per_team_rows = await asyncio.gather(
+        *[_fetch_team_member_rows(client, organization_name, team) for team in teams]
+    )
+    for rows in per_team_rows:
+        team_members_data.extend(rows)
 
     if not team_members_data:
         print(f"No team member data fetched for organization '{organization_name}'. Skipping CSV creation.")
         return False
 
     # Generate a unique CSV filename
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = f"{output_prefix}_{organization_name}_team_roles_{timestamp}.csv" # Specific filename
 
     csv_headers = ["Organization", "Team Name", "Username", "Team Role"]
@@ -272,8 +301,8 @@ def get_team_member_roles_to_csv(token: str, organization_name: str, output_pref
     print(f"--- Writing team members and roles to {csv_filename} ---")
     try:
         with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-            writer.writeheader()
+            writer = csv.writer(csvfile)
+            writer.writerow(csv_headers)
             writer.writerows(team_members_data)
         print(f"Successfully wrote team members and roles to {csv_filename}")
         return True
@@ -289,6 +318,7 @@ def generate_security_posture_summary_csv(
     all_dependabot_results: list[dict],
     org_roles_auditable: bool,
     team_roles_auditable: bool,
+    timestamp: str,
     output_prefix: str = "github_audit_report"
 ) -> None:
     """
@@ -328,17 +358,17 @@ def generate_security_posture_summary_csv(
         overall_comments.append("Current posture appears well-audited based on checks performed.")
 
 
-    summary_row = {
-        "Organization": organization_name,
-        "Dependabot Coverage": dependabot_summary_text,
-        "Org Roles Auditable": "Yes" if org_roles_auditable else "No",
-        "Team Roles Auditable": "Yes" if team_roles_auditable else "No",
-        "Recommended Actions": "; ".join(overall_comments)
-    }
+    # Same column order as csv_headers below
+    summary_row = (
+        organization_name,
+        dependabot_summary_text,
+        "Yes" if org_roles_auditable else "No",
+        "Yes" if team_roles_auditable else "No",
+        "; ".join(overall_comments)
+    )
     summary_data.append(summary_row)
 
     # Generate a unique CSV filename
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = f"{output_prefix}_{organization_name}_security_summary_{timestamp}.csv"
 
     csv_headers = [
@@ -352,8 +382,8 @@ def generate_security_posture_summary_csv(
     print(f"--- Writing security posture summary to {csv_filename} ---")
     try:
         with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-            writer.writeheader()
+            writer = csv.writer(csvfile)
+            writer.writerow(csv_headers)
             writer.writerows(summary_data)
         print(f"Successfully wrote security posture summary to {csv_filename}")
     except IOError as e:
@@ -363,42 +393,33 @@ def generate_security_posture_summary_csv(
 
 
 # --- Main Execution Block ---
-if __name__ == "__main__":
-    github_token = os.getenv("GITHUB_TOKEN")
-    repositories_str = os.getenv("GITHUB_REPOSITORIES")
-    github_organization = os.getenv("GITHUB_ORGANIZATION")
-    output_csv_prefix = os.getenv("OUTPUT_CSV_PREFIX", "github_audit_report")
+async def main():
+    cfg = AuditConfig.from_env()
 
-    if not github_token:
+    if not cfg.token:
         print("Error: GITHUB_TOKEN environment variable not set.")
         print("Please create a .env file or set the environment variable.")
         exit(1)
 
+    # One timestamp for the whole run, so every CSV from this audit carries the same suffix
+    run_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     all_dependabot_results = []
     org_roles_success = False
     team_roles_success = False
 
-    # --- 1. Dependabot Status Check ---
-    if repositories_str:
-        repositories_to_check = []
-        for repo_full_name in repositories_str.split(','):
-            repo_full_name = repo_full_name.strip()
-            if '/' in repo_full_name:
-                owner, repo_name = repo_full_name.split('/', 1)
-                repositories_to_check.append((owner, repo_name))
-            else:
-                print(f"Warning: Skipping malformed repository entry: '{repo_full_name}'. Expected format 'owner/repo'.")
-
-        if repositories_to_check:
+    # One shared client (connection pool, request cap, ETag cache) for every check below; closed
+    # (and the ETag cache saved) even if a check raises
+    async with GithubClient(cfg.token) as client:
+        # --- 1. Dependabot Status Check ---
+        if cfg.repos:
             print("\n--- Starting Dependabot Status Checks for Multiple Repositories ---")
-            for owner, repo_name in repositories_to_check:
-                result = verify_dependabot_status(github_token, owner, repo_name)
-                all_dependabot_results.append(result)
-                print(f"  {owner}/{repo_name}: {result['status_text']}")
+            # One aliased GraphQL query per DEPENDABOT_BATCH_SIZE repositories; REST only for repos it can't answer
+            all_dependabot_results = await verify_dependabot_status_batch(client, cfg.repos)
+            for result in all_dependabot_results:
+                print(f"  {result['owner']}/{result['repo_name']}: {result['status_text']}")
 
             # Generate CSV for Dependabot status
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            dependabot_csv_filename = f"{output_csv_prefix}_dependabot_status_{timestamp}.csv"
+            dependabot_csv_filename = f"{cfg.prefix}_dependabot_status_{run_timestamp}.csv"
             csv_headers_dependabot = ["Organization", "Repository Name", "Dependabot Status", "Detailed Message", "HTTP Status Code"]
 
             print(f"\n--- Writing Dependabot status results to {dependabot_csv_filename} ---")
@@ -406,46 +427,40 @@ if __name__ == "__main__":
                 with open(dependabot_csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
                     writer = csv.writer(csvfile)
                     writer.writerow(csv_headers_dependabot)
-                    for res in all_dependabot_results:
-                        writer.writerow([
-                            res["owner"],
-                            res["repo_name"],
-                            res["status_text"],
-                            res["message"],
-                            res["status_code"]
-                        ])
+                    writer.writerows(
+                        (res["owner"], res["repo_name"], res["status_text"], res["message"], res["status_code"])
+                        for res in all_dependabot_results
+                    )
                 print(f"Successfully wrote Dependabot status results to {dependabot_csv_filename}")
             except IOError as e:
                 print(f"Error writing Dependabot CSV file {dependabot_csv_filename}: {e}")
             except Exception as e:
                 print(f"An unexpected error occurred while writing Dependabot CSV: {e}")
         else:
-            print("\nNo repositories specified for Dependabot check. Skipping.")
-    else:
-        print("\nNo GITHUB_REPOSITORIES specified. Skipping Dependabot check.")
-
+            print("\nNo GITHUB_REPOSITORIES specified. Skipping Dependabot check.")
 
-    # --- 2. Organization Overall Roles Check ---
-    if github_organization:
-        org_roles_success = get_organization_roles_to_csv(github_token, github_organization, output_csv_prefix)
-    else:
-        print("\nNo GITHUB_ORGANIZATION specified for overall roles. Skipping.")
+        # --- 2. Organization Overall Roles Check ---
+        if cfg.org:
+            org_roles_success = await get_organization_roles_to_csv(client, cfg.org, run_timestamp, cfg.prefix)
+        else:
+            print("\nNo GITHUB_ORGANIZATION specified for overall roles. Skipping.")
 
-    # --- 3. NEW: Organization Team Member Roles Check ---
-    if github_organization:
-        team_roles_success = get_team_member_roles_to_csv(github_token, github_organization, output_csv_prefix)
-    else:
-        print("\nNo GITHUB_ORGANIZATION specified for team roles. Skipping.")
+        # --- 3. NEW: Organization Team Member Roles Check ---
+        if cfg.org:
+            team_roles_success = await get_team_member_roles_to_csv(client, cfg.org, run_timestamp, cfg.prefix)
+        else:
+            print("\nNo GITHUB_ORGANIZATION specified for team roles. Skipping.")
 
     # --- 4. NEW: Security Posture Summary Report ---
-    if github_organization or all_dependabot_results:
+    if cfg.org or all_dependabot_results:
         # Only generate if there's *some* data or an organization specified
         generate_security_posture_summary_csv(
-            github_organization if github_organization else "N/A", # Pass org name even if not explicitly set for repos
+            cfg.org if cfg.org else "N/A", # Pass org name even if not explicitly set for repos
             all_dependabot_results,
             org_roles_success,
             team_roles_success,
-            output_csv_prefix
+            run_timestamp,
+            cfg.prefix
         )
     else:
         print("\nNo data to generate Security Posture Summary. Skipping.")
@@ -453,4 +468,7 @@ if __name__ == "__main__":
     print("\n--- All Audits Complete ---")
     print("Remember to verify your GitHub token has the necessary permissions:")
     print("  For Dependabot: 'repo' scope (private) or 'public_repo' (public).")
-    print("  For Organization Roles and Team Roles: 'read:org' scope.")
\ No newline at end of file
+    print("  For Organization Roles and Team Roles: 'read:org' scope.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
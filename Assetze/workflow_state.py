@@ -7,5 +7,6 @@ class GithubTokenVerificationState(TypedDict):
     """
     token: str  # The GitHub token to verify
     verification_result: Optional[Dict[str, Any]]  # Raw result from the GitHub API tool
+    rate_limit: Optional[Dict[str, Any]]  # Core REST rate-limit status for the token, if available
     analysis_message: Optional[str]  # LLM's analysis of the verification result
     remediation_suggestions: Optional[str] # LLM's suggestions for fixing issues
\ No newline at end of file